@@ -55,20 +55,42 @@ class AsconCrypto:
         """
         start_time = time.time()
         
+        # Serialize payload to JSON bytes
+        plaintext = json.dumps(payload).encode('utf-8')
+        
+        ciphertext, nonce, _ = self.encrypt_bytes(plaintext, nonce)
+        
+        total_time = (time.time() - start_time) * 1000
+        
+        return ciphertext, nonce, total_time
+    
+    def encrypt_bytes(self, plaintext: bytes, nonce: Optional[bytes] = None) -> Tuple[bytes, bytes, float]:
+        """
+        Encrypt an already-serialized payload using Ascon-128
+        
+        Lets callers that send the same or pre-encoded JSON skip json.dumps
+        on every message
+        
+        Args:
+            plaintext: Serialized payload bytes
+            nonce: Optional 16-byte nonce (generated if not provided)
+        
+        Returns:
+            (ciphertext, nonce, encrypt_time_ms) tuple
+            
+        Security: Nonce MUST be unique per encryption with same key
+        """
+        start_time = time.time()
+        
         if nonce is None:
             nonce = os.urandom(16)  # 128-bit random nonce
         
         if len(nonce) != 16:
             raise ValueError(f"Nonce must be 16 bytes, got {len(nonce)} bytes")
         
-        # Serialize payload to JSON bytes
-        plaintext = json.dumps(payload).encode('utf-8')
-        
         # Ascon authenticated encryption
         # Parameters: key, nonce, associated_data, plaintext
-        crypto_start = time.time()
         ciphertext = ascon.encrypt(self.key, nonce, b'', plaintext)
-        crypto_time = (time.time() - crypto_start) * 1000  # Convert to ms
         
         total_time = (time.time() - start_time) * 1000
         
@@ -194,7 +194,8 @@ def save_vitals_to_database(vitals, hospital, dept, ward, patient_id):
         
         response = requests.post(api_url, json=payload, timeout=2)
         
-        if response.status_code == 200:
+        # 202: the dashboard queued the reading for its batch writer
+        if response.status_code in (200, 202):
             logging.debug(f"Saved encrypted vitals to DB: Patient {patient_id}")
             return True
         else:
@@ -1,6 +1,13 @@
+import os
+
+# Under the gunicorn eventlet worker, sockets and threads must be patched
+# before anything else imports them
+if os.environ.get('SOCKETIO_ASYNC_MODE') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+
 from flask import Flask, render_template, jsonify, request, send_file, redirect, url_for
 import requests
-import os
 import json
 from datetime import datetime
 import io
@@ -31,8 +38,15 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Initialize database with encryption support
 init_encrypted_db(app)
 
+# Initialize the shared cache (in-process unless CACHE_TYPE=RedisCache)
+from utils.cache import init_cache
+init_cache(app)
+
+# Main host calls share one keep-alive connection pool
+from utils.api import main_host_api
+
 # Initialize SocketIO for real-time updates
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=os.environ.get('SOCKETIO_ASYNC_MODE', 'threading'))
 
 # Background thread for broadcasting vitals
 def broadcast_vitals():
@@ -50,7 +64,7 @@ def broadcast_vitals():
     while True:
         try:
             # Fetch latest data from main_host
-            response = requests.get(f"{MAIN_HOST_URL}/api/dashboard-data", timeout=10)
+            response = main_host_api.session.get(f"{MAIN_HOST_URL}/api/dashboard-data", timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('status') == 'success':
@@ -135,7 +149,7 @@ def get_patients():
     """Get list of all patients"""
     try:
         # Query the main_host for a list of patients
-        response = requests.get(f"{MAIN_HOST_URL}/api/patients")
+        response = main_host_api.session.get(f"{MAIN_HOST_URL}/api/patients")
         return response.json()
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -145,7 +159,7 @@ def get_patient_data(patient_id):
     """Get data for a specific patient"""
     try:
         # Query the main_host for data for the specified patient
-        response = requests.get(f"{MAIN_HOST_URL}/api/patient/{patient_id}")
+        response = main_host_api.session.get(f"{MAIN_HOST_URL}/api/patient/{patient_id}")
         return response.json()
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -155,7 +169,7 @@ def get_metrics():
     """Get latest metrics from main_host"""
     try:
         # Query the main_host for dashboard data
-        response = requests.get(f"{MAIN_HOST_URL}/api/dashboard-data")
+        response = main_host_api.session.get(f"{MAIN_HOST_URL}/api/dashboard-data")
         return response.json()
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -6,11 +6,29 @@ import os
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.pool import StaticPool
 
 # Create a single SQLAlchemy instance
 db = SQLAlchemy()
 
+# Databases created before simple_db_init.py stored a page size use 4 KiB pages
+LEGACY_CIPHER_PAGE_SIZE = 4096
+
+def get_cipher_page_size(app):
+    """Page size the encrypted database was created with (stored by simple_db_init.py)"""
+    database = make_url(app.config.get('SQLALCHEMY_DATABASE_URI') or 'sqlite://').database
+    if not database:
+        return LEGACY_CIPHER_PAGE_SIZE
+    # Flask-SQLAlchemy resolves relative SQLite paths against the app root
+    if not os.path.isabs(database):
+        database = os.path.join(app.root_path, database)
+    try:
+        with open(database + '.cipher_page_size') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return LEGACY_CIPHER_PAGE_SIZE
+
 def init_encrypted_db(app):
     """
     Initialize database with encryption support
@@ -23,6 +41,10 @@ def init_encrypted_db(app):
     # Check if encryption is enabled
     ENABLE_DB_ENCRYPTION = os.getenv('ENABLE_DB_ENCRYPTION', 'false').lower() == 'true'
     
+    # Scrubbing freed page buffers roughly doubles SELECT cost; opt back in
+    # when decrypted pages must not linger in process memory
+    DB_CIPHER_MEMORY_SECURITY = os.getenv('DB_CIPHER_MEMORY_SECURITY', 'false').lower() == 'true'
+    
     if ENABLE_DB_ENCRYPTION:
         try:
             # Import SQLCipher
@@ -35,13 +57,20 @@ def init_encrypted_db(app):
                 'connect_args': {'check_same_thread': False}
             }
             
+            # Must match the page size the file was created with
+            cipher_page_size = get_cipher_page_size(app)
+            
+            # PRAGMA takes no bind parameters; build the quoted statement once
+            key_pragma = "PRAGMA key = '{}'".format(DB_ENCRYPTION_KEY.replace("'", "''"))
+            
             # Set up encryption key on each connection (global event listener)
             @event.listens_for(Engine, "connect")
             def set_sqlite_pragma(dbapi_conn, connection_record):
                 """Set encryption key for each new connection"""
                 cursor = dbapi_conn.cursor()
-                cursor.execute(f"PRAGMA key = '{DB_ENCRYPTION_KEY}'")
-                cursor.execute("PRAGMA cipher_page_size = 4096")
+                cursor.execute(key_pragma)
+                cursor.execute(f"PRAGMA cipher_page_size = {cipher_page_size}")
+                cursor.execute(f"PRAGMA cipher_memory_security = {'ON' if DB_CIPHER_MEMORY_SECURITY else 'OFF'}")
                 cursor.close()
             
             print("Database encryption ENABLED (SQLCipher)")
@@ -52,6 +81,19 @@ def init_encrypted_db(app):
     else:
         print("WARNING: Database encryption DISABLED (set ENABLE_DB_ENCRYPTION=true to enable)")
     
+    if app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite'):
+        # Registered after the SQLCipher key listener so the key is always set first
+        @event.listens_for(Engine, "connect")
+        def set_sqlite_performance_pragma(dbapi_conn, connection_record):
+            """WAL journal with NORMAL sync: one fsync per checkpoint instead of per commit"""
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+            cursor.execute("PRAGMA mmap_size = 268435456")
+            cursor.execute("PRAGMA cache_size = -65536")
+            cursor.close()
+    
     # Initialize database
     db.init_app(app)
     
@@ -1,8 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam
+from sqlalchemy.ext import baked
 from datetime import datetime
 
 from models.user import db, User
 
+# Compiled-SQL cache for the per-request patient lookups below
+bakery = baked.bakery()
+
 class Patient(db.Model):
     __tablename__ = 'patients'
     
@@ -22,8 +27,8 @@ class Patient(db.Model):
     discharge_date = db.Column(db.DateTime)
     status = db.Column(db.String(20), nullable=False)  # 'admitted', 'discharged', 'critical', 'stable'
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
     
     # Relationships
     locations = db.relationship('PatientLocation', backref='patient', lazy=True)
@@ -34,14 +39,22 @@ class Patient(db.Model):
         return f"{self.first_name} {self.last_name}"
     
     def get_age(self):
+        return self.calculate_age(self.date_of_birth)
+    
+    @staticmethod
+    def calculate_age(birth_date):
         today = datetime.today()
-        birth_date = self.date_of_birth
         age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
         return age
     
     def get_current_location(self):
         """Get the current active location of the patient"""
-        location = PatientLocation.query.filter_by(patient_id=self.patient_id, active=True).first()
+        bq = bakery(lambda session: session.query(PatientLocation))
+        bq += lambda q: q.filter(
+            PatientLocation.patient_id == bindparam('patient_id'),
+            PatientLocation.active == True
+        )
+        location = bq(db.session()).params(patient_id=self.patient_id).first()
         if location:
             return {
                 'hospital': location.hospital,
@@ -53,9 +66,12 @@ class Patient(db.Model):
     
     def get_recent_vitals(self, limit=1):
         """Get the most recent vital signs for the patient"""
-        vitals = PatientVitalSign.query.filter_by(patient_id=self.patient_id)\
-            .order_by(PatientVitalSign.recorded_at.desc())\
-            .limit(limit).all()
+        bq = bakery(lambda session: session.query(PatientVitalSign))
+        bq += lambda q: q.filter(PatientVitalSign.patient_id == bindparam('patient_id'))\
+            .order_by(PatientVitalSign.recorded_at.desc(), PatientVitalSign.vital_id.desc())
+        # The limit is part of the cache key, so each distinct limit is compiled once
+        bq.add_criteria(lambda q: q.limit(limit), limit)
+        vitals = bq(db.session()).params(patient_id=self.patient_id).all()
         return vitals
     
     def to_dict(self):
@@ -73,12 +89,67 @@ class Patient(db.Model):
             'discharge_date': self.discharge_date.isoformat() if self.discharge_date else None
         }
     
+    @classmethod
+    def iter_dicts(cls, after_id=None, limit=None, batch_size=500):
+        """
+        Yield the to_dict() payload for patients ordered by patient_id, from a single query
+        Selects only the needed columns and joins the active location instead
+        of loading each Patient and querying its location separately; rows are
+        fetched in batches so large tables are never held in memory at once.
+        after_id/limit give keyset pagination: patients with patient_id > after_id,
+        at most limit of them
+        """
+        query = db.session.query(
+            cls.patient_id, cls.mrn, cls.first_name, cls.last_name, cls.date_of_birth,
+            cls.gender, cls.blood_type, cls.status, cls.admission_date, cls.discharge_date,
+            PatientLocation.hospital, PatientLocation.department, PatientLocation.ward, PatientLocation.bed
+        ).outerjoin(
+            PatientLocation,
+            db.and_(PatientLocation.patient_id == cls.patient_id, PatientLocation.active == True)
+        )
+        if after_id is not None:
+            query = query.filter(cls.patient_id > after_id)
+        rows = query.order_by(cls.patient_id).yield_per(batch_size)
+        
+        last_patient_id = None
+        count = 0
+        for row in rows:
+            # Rows are ordered by patient, so only the first active location is kept
+            if row.patient_id == last_patient_id:
+                continue
+            if limit is not None and count >= limit:
+                break
+            last_patient_id = row.patient_id
+            count += 1
+            yield {
+                'patient_id': row.patient_id,
+                'mrn': row.mrn,
+                'name': f"{row.first_name} {row.last_name}",
+                'age': cls.calculate_age(row.date_of_birth),
+                'gender': row.gender,
+                'blood_type': row.blood_type,
+                'status': row.status,
+                'location': {
+                    'hospital': row.hospital,
+                    'department': row.department,
+                    'ward': row.ward,
+                    'bed': row.bed
+                } if row.hospital is not None else None,
+                'admission_date': row.admission_date.isoformat() if row.admission_date else None,
+                'discharge_date': row.discharge_date.isoformat() if row.discharge_date else None
+            }
+    
     def __repr__(self):
         return f'<Patient {self.mrn}: {self.get_full_name()}>'
 
 
 class PatientLocation(db.Model):
     __tablename__ = 'patient_locations'
+    __table_args__ = (
+        db.Index('ix_patient_locations_patient_assigned', 'patient_id', 'assigned_at'),
+        # Active-location lookups (current location, list join, discharge)
+        db.Index('ix_patient_locations_patient_active', 'patient_id', 'active'),
+    )
     
     location_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.patient_id'), nullable=False)
@@ -86,7 +157,7 @@ class PatientLocation(db.Model):
     department = db.Column(db.String(50), nullable=False)
     ward = db.Column(db.String(50), nullable=False)
     bed = db.Column(db.String(20))
-    assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
+    assigned_at = db.Column(db.DateTime, default=db.func.now())
     active = db.Column(db.Boolean, default=True)
     
     def __repr__(self):
@@ -95,6 +166,10 @@ class PatientLocation(db.Model):
 
 class PatientVitalSign(db.Model):
     __tablename__ = 'patient_vital_signs'
+    __table_args__ = (
+        # Latest-N vitals per patient becomes an index range scan instead of a sort
+        db.Index('ix_patient_vital_signs_patient_recorded', 'patient_id', 'recorded_at'),
+    )
     
     vital_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.patient_id'), nullable=False)
@@ -111,11 +186,45 @@ class PatientVitalSign(db.Model):
     wbc_count = db.Column(db.Float)
     anomaly_score = db.Column(db.Float)
     recorded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
-    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    recorded_at = db.Column(db.DateTime, default=db.func.now())
     
     # Relationship with user who recorded
     user = db.relationship('User', backref=db.backref('recorded_vitals', lazy=True))
     
+    # Columns serialized as-is by recent_dicts()
+    DICT_COLUMNS = (
+        'vital_id', 'patient_id', 'heart_rate', 'spo2', 'bp_systolic', 'bp_diastolic',
+        'respiratory_rate', 'temperature', 'etco2', 'fio2', 'blood_glucose', 'lactate',
+        'wbc_count', 'anomaly_score'
+    )
+    
+    @classmethod
+    def recent_dicts(cls, patient_id, limit=10):
+        """
+        Build the to_dict() payload for a patient's most recent vitals in one query
+        Selects only the serialized columns and joins the recording user's name
+        instead of loading each vital and lazy-loading its user
+        """
+        rows = db.session.query(
+            *(getattr(cls, name) for name in cls.DICT_COLUMNS),
+            cls.recorded_at, User.username, User.first_name, User.last_name
+        ).outerjoin(User, User.id == cls.recorded_by)\
+            .filter(cls.patient_id == patient_id)\
+            .order_by(cls.recorded_at.desc(), cls.vital_id.desc())\
+            .limit(limit).all()
+        
+        vitals = []
+        for row in rows:
+            vital = {name: getattr(row, name) for name in cls.DICT_COLUMNS}
+            if row.first_name and row.last_name:
+                # Same as User.get_full_name()
+                vital['recorded_by'] = f"{row.first_name} {row.last_name}"
+            else:
+                vital['recorded_by'] = row.username
+            vital['recorded_at'] = row.recorded_at.isoformat()
+            vitals.append(vital)
+        return vitals
+    
     def to_dict(self):
         """Convert vital signs to dictionary for API responses"""
         return {
@@ -143,6 +252,9 @@ class PatientVitalSign(db.Model):
 
 class PatientMedicalHistory(db.Model):
     __tablename__ = 'patient_medical_history'
+    __table_args__ = (
+        db.Index('ix_patient_medical_history_patient_diagnosis', 'patient_id', 'diagnosis_date'),
+    )
     
     history_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.patient_id'), nullable=False)
@@ -152,7 +264,7 @@ class PatientMedicalHistory(db.Model):
     medication = db.Column(db.String(255))
     notes = db.Column(db.Text)
     recorded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
-    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    recorded_at = db.Column(db.DateTime, default=db.func.now())
     
     # Relationship with user who recorded
     user = db.relationship('User', backref=db.backref('recorded_history', lazy=True))
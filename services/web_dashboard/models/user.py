@@ -1,11 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+import os
 
 # Initialize SQLAlchemy without app (we'll initialize it later in app.py)
 db = SQLAlchemy()
 
+# Password hashing cost - each stored hash records its own iteration count,
+# so this can be tuned per deployment without invalidating existing passwords
+PASSWORD_HASH_METHOD = f"pbkdf2:sha256:{int(os.getenv('PASSWORD_HASH_ITERATIONS', '150000'))}"
+
+# Permissions granted to each role (see User.has_permission)
+ROLE_PERMISSIONS = {
+    'admin': frozenset(['all', 'view_patients', 'edit_patients', 'view_vitals', 'add_vitals', 'manage_users']),
+    'doctor': frozenset(['view_patients', 'edit_patients', 'view_vitals', 'add_vitals']),
+    'nurse': frozenset(['view_patients', 'view_vitals', 'add_vitals']),
+    'technician': frozenset(['view_patients', 'view_vitals'])
+}
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
@@ -18,13 +30,13 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False)  # 'admin', 'doctor', 'nurse', 'technician'
     requested_role = db.Column(db.String(20))  # Role requested during registration
     department = db.Column(db.String(50))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
     last_login = db.Column(db.DateTime)
     is_active = db.Column(db.Boolean, default=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -43,17 +55,11 @@ class User(UserMixin, db.Model):
         - nurse: view_patients, view_vitals, add_vitals
         - technician: view_patients, view_vitals
         """
-        permissions = {
-            'admin': ['all', 'view_patients', 'edit_patients', 'view_vitals', 'add_vitals', 'manage_users'],
-            'doctor': ['view_patients', 'edit_patients', 'view_vitals', 'add_vitals'],
-            'nurse': ['view_patients', 'view_vitals', 'add_vitals'],
-            'technician': ['view_patients', 'view_vitals']
-        }
-        
-        if self.role not in permissions:
+        role_permissions = ROLE_PERMISSIONS.get(self.role)
+        if role_permissions is None:
             return False
             
-        return permission in permissions[self.role] or 'all' in permissions[self.role]
+        return permission in role_permissions or 'all' in role_permissions
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -61,12 +67,15 @@ class User(UserMixin, db.Model):
 
 class UserSession(db.Model):
     __tablename__ = 'user_sessions'
+    __table_args__ = (
+        db.Index('ix_user_sessions_user_expires', 'user_id', 'expires_at'),
+    )
     
     session_id = db.Column(db.String(128), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.String(256))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db.func.now())
     expires_at = db.Column(db.DateTime)
     
     # Relationship
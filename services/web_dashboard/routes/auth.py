@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.urls import url_parse
-from datetime import datetime, timedelta
 
 from models.user import User, UserSession, db
 
@@ -30,7 +29,7 @@ def login():
             return redirect(url_for('auth.login'))
             
         # Update last login time
-        user.last_login = datetime.utcnow()
+        user.last_login = db.func.now()
         db.session.commit()
         
         # Log in user (Flask-Login handles session management)
@@ -1,27 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 
 # Import the API utility for consistency
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.api import main_host_api
+from utils.api import get_dashboard_data
+from utils.responses import conditional_html, json_response
 
 main = Blueprint('main', __name__)
 
+# The anonymous landing page has no per-user content, so it is rendered once
+_anonymous_index_html = None
+
 @main.route('/')
 def index():
     """Landing page - redirects based on authentication status"""
+    global _anonymous_index_html
     if current_user.is_authenticated:
         return redirect(url_for('main.dashboard'))
-    return render_template('index.html')
+    if _anonymous_index_html is None:
+        _anonymous_index_html = render_template('index.html')
+    return conditional_html(_anonymous_index_html, max_age=60)
 
 @main.route('/dashboard')
 @login_required
 def dashboard():
     """Main dashboard - requires authentication"""
     # Pre-fetch data to ensure consistency with patients page
-    dashboard_data = main_host_api.get_dashboard_data()
+    dashboard_data = get_dashboard_data()
     return render_template('dashboard.html', dashboard_available=dashboard_data is not None)
 
 @main.route('/api/metrics')
@@ -29,17 +33,17 @@ def dashboard():
 def api_metrics():
     """API endpoint to fetch real-time patient metrics from main_host"""
     try:
-        dashboard_data = main_host_api.get_dashboard_data()
+        dashboard_data = get_dashboard_data()
         if dashboard_data and dashboard_data.get('status') == 'success':
-            return jsonify(dashboard_data)
+            return json_response(dashboard_data)
         else:
-            return jsonify({
+            return json_response({
                 'status': 'error',
                 'message': 'Failed to fetch data from main host',
                 'data': {}
             }), 503
     except Exception as e:
-        return jsonify({
+        return json_response({
             'status': 'error',
             'message': str(e),
             'data': {}
@@ -48,10 +52,10 @@ def api_metrics():
 @main.route('/monitoring')
 def monitoring():
     """Page with the embedded Grafana monitoring dashboard (public)"""
-    return render_template('monitoring.html')
+    return conditional_html(render_template('monitoring.html'), max_age=60)
 
 @main.route('/analytics')
 @login_required
 def analytics():
     """Analytics dashboard with charts and statistics - requires authentication"""
-    return render_template('analytics.html')
\ No newline at end of file
+    return conditional_html(render_template('analytics.html'), max_age=5)
\ No newline at end of file
@@ -1,82 +1,144 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, stream_with_context, current_app, abort
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+import base64
+import hashlib
 import os
+import queue
+import threading
+import time
+import traceback
+
+import orjson
+from cryptography.fernet import Fernet
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from models.patient import Patient, PatientLocation, PatientVitalSign, PatientMedicalHistory, db
+# The app directory is already on sys.path (same as for models above)
+from utils.api import get_dashboard_data, get_patient_data
+from utils.cache import cache, dedup_cache
+from utils.responses import conditional_render, json_response
 
 patients = Blueprint('patients', __name__)
 
-# Import the API utility
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.api import main_host_api
+def _main_host_patient_info(patient_id, record):
+    """Create a patient-like object for templates from a main host vitals record"""
+    return {
+        'patient_id': patient_id,
+        'first_name': f'Patient {patient_id}',  # Better naming
+        'last_name': '',
+        'hospital': record.get('hospital', 'Unknown'),
+        'dept': record.get('dept', 'Unknown'),
+        'ward': record.get('ward', 'Unknown'),
+        'heart_rate': record.get('heart_rate'),
+        'spo2': record.get('spo2'),
+        'bp_systolic': record.get('bp_systolic'),
+        'bp_diastolic': record.get('bp_diastolic'),
+        'respiratory_rate': record.get('respiratory_rate'),
+        'temperature': record.get('temperature'),
+        'etco2': record.get('etco2'),
+        'fio2': record.get('fio2'),
+        'blood_glucose': record.get('blood_glucose'),
+        'lactate': record.get('lactate'),
+        'wbc_count': record.get('wbc_count'),
+        'anomaly_score': record.get('anomaly_score', 0),
+        'timestamp': record.get('timestamp')
+    }
+
+# Patient form fields copied as-is by create_patient and edit_patient
+_PATIENT_TEXT_FIELDS = (
+    'mrn', 'first_name', 'last_name', 'gender', 'blood_type', 'address', 'phone', 'email',
+    'emergency_contact', 'emergency_phone', 'status', 'notes'
+)
+_PATIENT_DATETIME_FIELDS = ('admission_date', 'discharge_date')
+
+def _parse_patient_form(form):
+    """Read the patient form into Patient column values, parsing the date fields"""
+    data = {field: form.get(field) for field in _PATIENT_TEXT_FIELDS}
+    data['date_of_birth'] = date.fromisoformat(form.get('date_of_birth'))
+    for field in _PATIENT_DATETIME_FIELDS:
+        value = form.get(field)
+        # '%Y-%m-%d %H:%M' is ISO 8601, so use the C fromisoformat parser
+        data[field] = datetime.fromisoformat(value) if value else None
+    return data
+
+def _abort_if_no_patient(patient_id):
+    """404 unless the patient exists (EXISTS query, no row is loaded)"""
+    exists = db.session.query(
+        db.session.query(Patient.patient_id).filter_by(patient_id=patient_id).exists()
+    ).scalar()
+    if not exists:
+        abort(404)
+
+# Patients built from main host data are shared by all viewers for a short time
+_PATIENTS_CACHE_KEY = 'dashboard_patients'
+_PATIENTS_CACHE_TIMEOUT = 30
+
+def _get_dashboard_patients():
+    """
+    Get the patient list from main host dashboard data (cached for 30 seconds)
+    Returns (patients_list, version) where version changes whenever the list does
+    """
+    cached = cache.get(_PATIENTS_CACHE_KEY)
+    if cached is not None:
+        return cached
+    
+    dashboard_data = get_dashboard_data()
+    if not dashboard_data or dashboard_data.get('status') != 'success':
+        # Don't cache failures so the next request retries main host
+        return [], 'empty'
+    
+    # Convert main host data to patient format, keeping the first record per patient
+    data = dashboard_data.get('data', {})
+    by_id = {}
+    
+    for patient_data in data.values():
+        if isinstance(patient_data, dict):
+            patient_id = patient_data.get('patient', 'Unknown')
+            if patient_id not in by_id:
+                patient_info = _main_host_patient_info(patient_id, patient_data)
+                patient_info['status'] = 'active'
+                by_id[patient_id] = patient_info
+    
+    patients_list = list(by_id.values())
+    version = hashlib.blake2b(orjson.dumps(patients_list), digest_size=8).hexdigest()
+    cache.set(_PATIENTS_CACHE_KEY, (patients_list, version), timeout=_PATIENTS_CACHE_TIMEOUT)
+    return patients_list, version
 
 # Patient views (HTML pages)
 @patients.route('/')
 @login_required
 def list_patients():
     """Show list of all patients - requires authentication"""
-    # Try to get data from main host first
-    dashboard_data = main_host_api.get_dashboard_data()
-    patients_list = []
-    
-    if dashboard_data and dashboard_data.get('status') == 'success':
-        # Convert main host data to patient format
-        data = dashboard_data.get('data', {})
-        seen_patients = set()
-        
-        for key, patient_data in data.items():
-            if isinstance(patient_data, dict):
-                patient_id = patient_data.get('patient', 'Unknown')
-                if patient_id not in seen_patients:
-                    seen_patients.add(patient_id)
-                    
-                    # Create a patient-like object for template
-                    patient_info = {
-                        'patient_id': patient_id,
-                        'first_name': f'Patient {patient_id}',  # Better naming
-                        'last_name': '',
-                        'hospital': patient_data.get('hospital', 'Unknown'),
-                        'dept': patient_data.get('dept', 'Unknown'),
-                        'ward': patient_data.get('ward', 'Unknown'),
-                        'status': 'active',
-                        'heart_rate': patient_data.get('heart_rate'),
-                        'spo2': patient_data.get('spo2'),
-                        'bp_systolic': patient_data.get('bp_systolic'),
-                        'bp_diastolic': patient_data.get('bp_diastolic'),
-                        'respiratory_rate': patient_data.get('respiratory_rate'),
-                        'temperature': patient_data.get('temperature'),
-                        'etco2': patient_data.get('etco2'),
-                        'fio2': patient_data.get('fio2'),
-                        'blood_glucose': patient_data.get('blood_glucose'),
-                        'lactate': patient_data.get('lactate'),
-                        'wbc_count': patient_data.get('wbc_count'),
-                        'anomaly_score': patient_data.get('anomaly_score', 0),
-                        'timestamp': patient_data.get('timestamp')
-                    }
-                    patients_list.append(patient_info)
-    
     # If no data from main host, show empty list (consistent with home page)
-    if not patients_list:
-        patients_list = []
+    patients_list, version = _get_dashboard_patients()
     
-    return render_template('patients/list.html', patients=patients_list)
+    # The page shows the patient list and the logged-in user, so the ETag covers
+    # both and an unchanged list is answered with 304 before rendering
+    etag = f'{version}-{current_user.get_id()}'
+    return conditional_render(
+        etag,
+        lambda: render_template('patients/list.html', patients=patients_list),
+        max_age=5
+    )
 
 @patients.route('/<patient_id>')
 def view_patient(patient_id):
     """Show details for a specific patient (public, no login required)"""
     # Try to get data from main host first
-    patient_data = main_host_api.get_patient_data(patient_id)
+    patient_data = get_patient_data(patient_id)
     
     if patient_data and patient_data.get('status') == 'success':
         # Use main host data
         data = patient_data.get('data', {})
         # Find the most recent data for this patient
         patient_info = None
-        for key, patient_record in data.items():
-            if isinstance(patient_record, dict) and str(patient_record.get('patient')) == str(patient_id):
+        patient_id_str = str(patient_id)
+        for patient_record in data.values():
+            if isinstance(patient_record, dict) and str(patient_record.get('patient')) == patient_id_str:
                 patient_info = {
                     'patient_id': patient_id,
                     'first_name': f'Patient {patient_id}',
@@ -99,11 +161,24 @@ def view_patient(patient_id):
     
     # Fallback to database or show error
     try:
-        patient = Patient.query.get_or_404(int(patient_id))
+        # History and locations are loaded with the patient (the template also reads
+        # patient.medical_history), then ordered newest first like the old queries
+        patient = Patient.query.options(
+            selectinload(Patient.medical_history),
+            selectinload(Patient.locations)
+        ).get_or_404(int(patient_id))
         latest_vitals = patient.get_recent_vitals(1)
         latest_vital = latest_vitals[0] if latest_vitals else None
-        medical_history = PatientMedicalHistory.query.filter_by(patient_id=patient_id).order_by(PatientMedicalHistory.diagnosis_date.desc()).all()
-        location_history = PatientLocation.query.filter_by(patient_id=patient_id).order_by(PatientLocation.assigned_at.desc()).all()
+        medical_history = sorted(
+            patient.medical_history,
+            key=lambda h: (h.diagnosis_date is not None, h.diagnosis_date or date.min, h.history_id),
+            reverse=True
+        )
+        location_history = sorted(
+            patient.locations,
+            key=lambda l: (l.assigned_at is not None, l.assigned_at or datetime.min, l.location_id),
+            reverse=True
+        )
         return render_template('patients/view.html', 
                               patient=patient, 
                               latest_vital=latest_vital,
@@ -118,7 +193,7 @@ def patient_vitals(patient_id):
     """Show vital sign history for a patient (public, no login required)"""
     patient = Patient.query.get_or_404(patient_id)
     # Get all vitals, ordered by most recent first
-    vitals = PatientVitalSign.query.filter_by(patient_id=patient_id).order_by(PatientVitalSign.recorded_at.desc()).all()
+    vitals = PatientVitalSign.query.filter_by(patient_id=patient_id).order_by(PatientVitalSign.recorded_at.desc(), PatientVitalSign.vital_id.desc()).all()
     return render_template('patients/vitals.html', patient=patient, vitals=vitals)
 
 @patients.route('/<int:patient_id>/vitals/add', methods=['GET', 'POST'])
@@ -128,10 +203,10 @@ def add_vitals(patient_id):
     if not current_user.has_permission('add_vitals'):
         flash('You do not have permission to add vital signs.')
         return redirect(url_for('patients.view_patient', patient_id=patient_id))
-        
-    patient = Patient.query.get_or_404(patient_id)
     
     if request.method == 'POST':
+        _abort_if_no_patient(patient_id)
+        
         # Create new vital sign record
         new_vitals = PatientVitalSign(
             patient_id=patient_id,
@@ -142,8 +217,7 @@ def add_vitals(patient_id):
             respiratory_rate=request.form.get('respiratory_rate', type=float),
             temperature=request.form.get('temperature', type=float),
             etco2=request.form.get('etco2', type=float),
-            recorded_by=current_user.user_id,
-            recorded_at=datetime.utcnow()
+            recorded_by=current_user.user_id
         )
         
         db.session.add(new_vitals)
@@ -152,6 +226,7 @@ def add_vitals(patient_id):
         flash('Vital signs recorded successfully.')
         return redirect(url_for('patients.patient_vitals', patient_id=patient_id))
         
+    patient = Patient.query.get_or_404(patient_id)
     return render_template('patients/add_vitals.html', patient=patient)
 
 @patients.route('/create', methods=['GET', 'POST'])
@@ -164,25 +239,15 @@ def create_patient():
         
     if request.method == 'POST':
         # Create new patient record
-        new_patient = Patient(
-            mrn=request.form.get('mrn'),
-            first_name=request.form.get('first_name'),
-            last_name=request.form.get('last_name'),
-            date_of_birth=datetime.strptime(request.form.get('date_of_birth'), '%Y-%m-%d').date(),
-            gender=request.form.get('gender'),
-            blood_type=request.form.get('blood_type'),
-            address=request.form.get('address'),
-            phone=request.form.get('phone'),
-            email=request.form.get('email'),
-            emergency_contact=request.form.get('emergency_contact'),
-            emergency_phone=request.form.get('emergency_phone'),
-            admission_date=datetime.strptime(request.form.get('admission_date'), '%Y-%m-%d %H:%M') if request.form.get('admission_date') else None,
-            status=request.form.get('status', 'admitted'),
-            notes=request.form.get('notes')
-        )
+        patient_data = _parse_patient_form(request.form)
+        patient_data.pop('discharge_date')
+        if patient_data['status'] is None:
+            patient_data['status'] = 'admitted'
+        new_patient = Patient(**patient_data)
         
         db.session.add(new_patient)
-        db.session.commit()
+        # Flush to assign patient_id; patient and location commit together below
+        db.session.flush()
         
         # Add initial location if provided
         if request.form.get('hospital') and request.form.get('department') and request.form.get('ward'):
@@ -192,12 +257,12 @@ def create_patient():
                 department=request.form.get('department'),
                 ward=request.form.get('ward'),
                 bed=request.form.get('bed'),
-                assigned_at=datetime.utcnow(),
                 active=True
             )
             
             db.session.add(location)
-            db.session.commit()
+        
+        db.session.commit()
             
         flash(f'Patient {new_patient.get_full_name()} created successfully.')
         return redirect(url_for('patients.view_patient', patient_id=new_patient.patient_id))
@@ -216,33 +281,23 @@ def edit_patient(patient_id):
     
     if request.method == 'POST':
         # Update patient record
-        patient.mrn = request.form.get('mrn')
-        patient.first_name = request.form.get('first_name')
-        patient.last_name = request.form.get('last_name')
-        patient.date_of_birth = datetime.strptime(request.form.get('date_of_birth'), '%Y-%m-%d').date()
-        patient.gender = request.form.get('gender')
-        patient.blood_type = request.form.get('blood_type')
-        patient.address = request.form.get('address')
-        patient.phone = request.form.get('phone')
-        patient.email = request.form.get('email')
-        patient.emergency_contact = request.form.get('emergency_contact')
-        patient.emergency_phone = request.form.get('emergency_phone')
-        patient.status = request.form.get('status')
-        patient.notes = request.form.get('notes')
+        patient_data = _parse_patient_form(request.form)
+        for field in _PATIENT_TEXT_FIELDS + ('date_of_birth',):
+            setattr(patient, field, patient_data[field])
         
         # Handle admission/discharge dates
-        if request.form.get('admission_date'):
-            patient.admission_date = datetime.strptime(request.form.get('admission_date'), '%Y-%m-%d %H:%M')
+        if patient_data['admission_date']:
+            patient.admission_date = patient_data['admission_date']
         
-        if request.form.get('discharge_date'):
-            patient.discharge_date = datetime.strptime(request.form.get('discharge_date'), '%Y-%m-%d %H:%M')
+        if patient_data['discharge_date']:
+            patient.discharge_date = patient_data['discharge_date']
             
             # If discharged, mark all locations as inactive
             if patient.status == 'discharged':
-                for location in patient.locations:
-                    location.active = False
+                PatientLocation.query.filter_by(patient_id=patient_id, active=True)\
+                    .update({'active': False}, synchronize_session=False)
         
-        patient.updated_at = datetime.utcnow()
+        patient.updated_at = db.func.now()
         db.session.commit()
         
         flash(f'Patient {patient.get_full_name()} updated successfully.')
@@ -257,13 +312,13 @@ def update_location(patient_id):
     if not current_user.has_permission('edit_patients'):
         flash('You do not have permission to update patient location.')
         return redirect(url_for('patients.view_patient', patient_id=patient_id))
-        
-    patient = Patient.query.get_or_404(patient_id)
     
     if request.method == 'POST':
-        # Mark all existing locations as inactive
-        for location in patient.locations:
-            location.active = False
+        _abort_if_no_patient(patient_id)
+        
+        # Mark all existing locations as inactive in a single UPDATE
+        PatientLocation.query.filter_by(patient_id=patient_id, active=True)\
+            .update({'active': False}, synchronize_session=False)
             
         # Create new location
         new_location = PatientLocation(
@@ -272,7 +327,6 @@ def update_location(patient_id):
             department=request.form.get('department'),
             ward=request.form.get('ward'),
             bed=request.form.get('bed'),
-            assigned_at=datetime.utcnow(),
             active=True
         )
         
@@ -282,6 +336,7 @@ def update_location(patient_id):
         flash(f'Patient location updated successfully.')
         return redirect(url_for('patients.view_patient', patient_id=patient_id))
         
+    patient = Patient.query.get_or_404(patient_id)
     return render_template('patients/update_location.html', patient=patient)
 
 @patients.route('/<int:patient_id>/medical-history/add', methods=['GET', 'POST'])
@@ -291,20 +346,19 @@ def add_medical_history(patient_id):
     if not current_user.has_permission('edit_patients'):
         flash('You do not have permission to add medical history.')
         return redirect(url_for('patients.view_patient', patient_id=patient_id))
-        
-    patient = Patient.query.get_or_404(patient_id)
     
     if request.method == 'POST':
+        _abort_if_no_patient(patient_id)
+        
         # Create new medical history record
         history = PatientMedicalHistory(
             patient_id=patient_id,
             condition=request.form.get('condition'),
-            diagnosis_date=datetime.strptime(request.form.get('diagnosis_date'), '%Y-%m-%d').date() if request.form.get('diagnosis_date') else None,
+            diagnosis_date=date.fromisoformat(request.form.get('diagnosis_date')) if request.form.get('diagnosis_date') else None,
             treatment=request.form.get('treatment'),
             medication=request.form.get('medication'),
             notes=request.form.get('notes'),
-            recorded_by=current_user.user_id,
-            recorded_at=datetime.utcnow()
+            recorded_by=current_user.user_id
         )
         
         db.session.add(history)
@@ -313,42 +367,90 @@ def add_medical_history(patient_id):
         flash('Medical history added successfully.')
         return redirect(url_for('patients.view_patient', patient_id=patient_id))
         
+    patient = Patient.query.get_or_404(patient_id)
     return render_template('patients/add_medical_history.html', patient=patient)
 
 # API endpoints (JSON responses)
+# Largest page api_list_patients serves, and the most rows fetched per batch
+_API_PATIENTS_MAX_LIMIT = 500
+
 @patients.route('/api')
 @login_required
 def api_list_patients():
-    """API endpoint to get a list of all patients"""
+    """
+    API endpoint to get a list of all patients
+    Optional keyset pagination: ?after_id=<last patient_id seen>&limit=<page size>;
+    next_after_id in the response is the after_id for the next page (null when done)
+    """
     if not current_user.has_permission('view_patients'):
-        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
-        
-    all_patients = Patient.query.all()
-    patients_list = [patient.to_dict() for patient in all_patients]
+        return json_response({'status': 'error', 'message': 'Unauthorized'}), 403
     
-    return jsonify({
-        'status': 'success',
-        'count': len(patients_list),
-        'patients': patients_list
-    })
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        if limit <= 0:
+            return json_response({'status': 'error', 'message': 'limit must be a positive integer'}), 400
+        limit = min(limit, _API_PATIENTS_MAX_LIMIT)
+    
+    # Small pages don't fetch a full batch of joined rows
+    rows = Patient.iter_dicts(
+        after_id=after_id,
+        limit=limit,
+        batch_size=limit or _API_PATIENTS_MAX_LIMIT
+    )
+    
+    # Run the query and read the first row before any bytes are sent, so a
+    # database error is still a real 500 instead of a truncated 200
+    try:
+        first = next(rows, None)
+    except Exception as e:
+        print(f"ERROR: Error listing patients: {e}")
+        print(traceback.format_exc())
+        return json_response({'status': 'error', 'message': 'Failed to list patients'}), 500
+    
+    # Stream the list as rows arrive; count is only known at the end
+    def generate():
+        yield b'{"status":"success","patients":['
+        if first is None:
+            yield b'],"count":0,"next_after_id":null}'
+            return
+        yield orjson.dumps(first)
+        count = 1
+        last_patient_id = first['patient_id']
+        try:
+            for patient in rows:
+                yield b','
+                yield orjson.dumps(patient)
+                count += 1
+                last_patient_id = patient['patient_id']
+        except Exception as e:
+            # Headers are already sent; log and abort the stream so the client
+            # gets a broken response rather than a valid-looking short list
+            print(f"ERROR: Error streaming patient list after {count} rows: {e}")
+            print(traceback.format_exc())
+            raise
+        next_after_id = last_patient_id if limit is not None and count == limit else None
+        yield b'],"count":%d,"next_after_id":%s}' % (count, orjson.dumps(next_after_id))
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @patients.route('/api/<int:patient_id>')
 @login_required
 def api_get_patient(patient_id):
     """API endpoint to get details for a specific patient"""
     if not current_user.has_permission('view_patients'):
-        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+        return json_response({'status': 'error', 'message': 'Unauthorized'}), 403
         
     patient = Patient.query.get_or_404(patient_id)
     
     # Get detailed patient information including latest vitals
     patient_data = patient.to_dict()
     
-    # Add latest vital signs if available
-    latest_vitals = patient.get_recent_vitals(1)
-    patient_data['latest_vitals'] = latest_vitals[0].to_dict() if latest_vitals else None
+    # Add latest vital signs if available (one query, recorder's name joined in)
+    latest_vitals = PatientVitalSign.recent_dicts(patient_id, 1)
+    patient_data['latest_vitals'] = latest_vitals[0] if latest_vitals else None
     
-    return jsonify({
+    return json_response({
         'status': 'success',
         'patient': patient_data
     })
@@ -358,25 +460,24 @@ def api_get_patient(patient_id):
 def api_get_patient_vitals(patient_id):
     """API endpoint to get vital sign history for a patient"""
     if not current_user.has_permission('view_vitals'):
-        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+        return json_response({'status': 'error', 'message': 'Unauthorized'}), 403
         
-    # Check if patient exists
-    patient = Patient.query.get_or_404(patient_id)
+    # Check if patient exists (only the name is needed)
+    patient = db.session.query(Patient.first_name, Patient.last_name)\
+        .filter(Patient.patient_id == patient_id).first()
+    if patient is None:
+        abort(404)
     
     # Get limit parameter (default to 10)
     limit = request.args.get('limit', 10, type=int)
     
     # Get vitals, ordered by most recent first
-    vitals = PatientVitalSign.query.filter_by(patient_id=patient_id)\
-        .order_by(PatientVitalSign.recorded_at.desc())\
-        .limit(limit).all()
-    
-    vitals_list = [vital.to_dict() for vital in vitals]
+    vitals_list = PatientVitalSign.recent_dicts(patient_id, limit)
     
-    return jsonify({
+    return json_response({
         'status': 'success',
         'patient_id': patient_id,
-        'patient_name': patient.get_full_name(),
+        'patient_name': f"{patient.first_name} {patient.last_name}",
         'count': len(vitals_list),
         'vitals': vitals_list
     })
@@ -386,7 +487,7 @@ def api_get_patient_vitals(patient_id):
 def api_add_patient_vitals(patient_id):
     """API endpoint to add new vital signs for a patient"""
     if not current_user.has_permission('add_vitals'):
-        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+        return json_response({'status': 'error', 'message': 'Unauthorized'}), 403
         
     # Check if patient exists
     patient = Patient.query.get_or_404(patient_id)
@@ -395,7 +496,7 @@ def api_add_patient_vitals(patient_id):
     data = request.json
     
     if not data:
-        return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+        return json_response({'status': 'error', 'message': 'No data provided'}), 400
     
     # Create new vital sign record
     new_vitals = PatientVitalSign(
@@ -407,14 +508,13 @@ def api_add_patient_vitals(patient_id):
         respiratory_rate=data.get('respiratory_rate'),
         temperature=data.get('temperature'),
         etco2=data.get('etco2'),
-        recorded_by=current_user.user_id,
-        recorded_at=datetime.utcnow()
+        recorded_by=current_user.user_id
     )
     
     db.session.add(new_vitals)
     db.session.commit()
     
-    return jsonify({
+    return json_response({
         'status': 'success',
         'message': 'Vital signs recorded successfully',
         'vital_id': new_vitals.vital_id,
@@ -422,6 +522,143 @@ def api_add_patient_vitals(patient_id):
         'patient_name': patient.get_full_name()
     })
 
+@lru_cache(maxsize=1)
+def _get_vitals_cipher():
+    """Fernet cipher for vitals from main_host, derived once from DB_ENCRYPTION_KEY"""
+    encryption_key = os.getenv('DB_ENCRYPTION_KEY', 'default-32-char-key-change-this!')
+    key_hash = hashlib.sha256(encryption_key.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(key_hash))
+
+# Encrypted vitals arrive at telemetry rate, so they are written by a background
+# thread in batches (one commit per batch instead of one per reading)
+_VITALS_BATCH_SIZE = 100
+_VITALS_FLUSH_INTERVAL = 0.05  # seconds
+# Bounded so a stalled writer sheds load (503) instead of growing memory
+_VITALS_QUEUE_MAXSIZE = 10000
+_vitals_queue = queue.Queue(maxsize=_VITALS_QUEUE_MAXSIZE)
+_vitals_writer = None
+_vitals_writer_lock = threading.Lock()
+# Identical encrypted payloads seen within this many seconds are dropped
+_DUPLICATE_VITALS_WINDOW = 30
+
+def _start_vitals_writer(app):
+    """Start the batch writer thread on first use"""
+    global _vitals_writer
+    if _vitals_writer is not None:
+        return
+    with _vitals_writer_lock:
+        if _vitals_writer is None:
+            _vitals_writer = threading.Thread(target=_vitals_writer_loop, args=(app,), daemon=True)
+            _vitals_writer.start()
+
+def _create_writer_session(app):
+    """
+    Session on the writer's own connection
+    With SQLCipher the app engine uses StaticPool (one connection shared by every
+    thread), so writer commits/rollbacks there would commit or discard other
+    requests' open transactions
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options['poolclass'] = StaticPool
+    options['connect_args'] = dict(options.get('connect_args', {}), check_same_thread=False)
+    with app.app_context():
+        url = db.engine.url
+    return sessionmaker(bind=create_engine(url, **options))()
+
+def _vitals_writer_loop(app):
+    """Drain up to _VITALS_BATCH_SIZE queued vitals per flush interval and save them"""
+    session = _create_writer_session(app)
+    while True:
+        batch = [_vitals_queue.get()]
+        deadline = time.monotonic() + _VITALS_FLUSH_INTERVAL
+        while len(batch) < _VITALS_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_vitals_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        with app.app_context():
+            try:
+                _save_vitals_batch(session, batch)
+            except Exception as e:
+                session.rollback()
+                print(f"ERROR: Error saving batch of {len(batch)} encrypted vitals: {e}")
+                print(traceback.format_exc())
+                if len(batch) > 1:
+                    _save_vitals_individually(session, batch)
+
+def _save_vitals_individually(session, batch):
+    """Retry a failed batch one reading at a time so one bad row doesn't drop the rest"""
+    for item in batch:
+        try:
+            _save_vitals_batch(session, [item])
+        except Exception as e:
+            session.rollback()
+            patient_id_str, _, timestamp_str, _ = item
+            print(f"ERROR: Dropped encrypted vitals for patient {patient_id_str} "
+                  f"at {timestamp_str or 'unknown time'}: {e}")
+
+def _save_vitals_batch(session, batch):
+    """Insert a batch of decrypted vitals, creating unknown patients, in one transaction"""
+    mrns = {patient_id_str for patient_id_str, _, _, _ in batch}
+    patients_by_mrn = {p.mrn: p for p in session.query(Patient).filter(Patient.mrn.in_(mrns))}
+    
+    for mrn in mrns - patients_by_mrn.keys():
+        # Create new patient record with minimal info
+        patient = Patient(
+            mrn=mrn,
+            first_name=f"Patient {mrn}",
+            last_name="",
+            date_of_birth=datetime(2000, 1, 1).date(),  # Placeholder
+            gender='unknown',
+            status='admitted'
+        )
+        session.add(patient)
+        patients_by_mrn[mrn] = patient
+    # Flush for the new patient_ids; committed together with the vitals below
+    session.flush()
+    
+    session.bulk_save_objects([
+        PatientVitalSign(
+            patient_id=patients_by_mrn[patient_id_str].patient_id,
+            heart_rate=vitals_data.get('heart_rate'),
+            spo2=vitals_data.get('spo2'),
+            bp_systolic=vitals_data.get('bp_systolic'),
+            bp_diastolic=vitals_data.get('bp_diastolic'),
+            respiratory_rate=vitals_data.get('respiratory_rate'),
+            temperature=vitals_data.get('temperature'),
+            etco2=vitals_data.get('etco2'),
+            fio2=vitals_data.get('fio2'),
+            blood_glucose=vitals_data.get('blood_glucose'),
+            lactate=vitals_data.get('lactate'),
+            wbc_count=vitals_data.get('wbc_count'),
+            anomaly_score=vitals_data.get('anomaly_score'),
+            recorded_by=None,  # No user - automated system
+            recorded_at=recorded_at
+        )
+        for patient_id_str, vitals_data, _, recorded_at in batch
+    ])
+    session.commit()
+    
+    # Emit one real-time WebSocket event for the whole stored batch
+    try:
+        from app import socketio
+        now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        socketio.emit('vitals_batch', [
+            {
+                'patient_id': patient_id_str,
+                'vitals': vitals_data,
+                'anomaly_score': vitals_data.get('anomaly_score'),
+                'timestamp': timestamp_str or now_str
+            }
+            for patient_id_str, vitals_data, timestamp_str, _ in batch
+        ], namespace='/')
+    except Exception as emit_error:
+        print(f"WARNING: WebSocket emit failed: {emit_error}")
+
 # Internal API endpoint for main_host backend (no authentication required)
 @patients.route('/api/vitals/save', methods=['POST'])
 def api_save_encrypted_vitals():
@@ -435,110 +672,69 @@ def api_save_encrypted_vitals():
         "patient_id": "P001"
     }
     """
-    import base64
-    import json
-    from cryptography.fernet import Fernet
-    import hashlib
-    
     # Get data from request
     data = request.json
     
     if not data:
-        return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+        return json_response({'status': 'error', 'message': 'No data provided'}), 400
     
     encrypted_vitals = data.get('encrypted_vitals')
     patient_id_str = data.get('patient_id')
     
     if not encrypted_vitals or not patient_id_str:
-        return jsonify({'status': 'error', 'message': 'Missing required fields'}), 400
+        return json_response({'status': 'error', 'message': 'Missing required fields'}), 400
+    
+    # Skip payloads already received recently (main_host retries / duplicate telemetry)
+    payload_key = 'vitals:' + hashlib.blake2b(encrypted_vitals.encode(), digest_size=16).hexdigest()
+    if not dedup_cache.add(payload_key, True, timeout=_DUPLICATE_VITALS_WINDOW):
+        return json_response({
+            'status': 'success',
+            'message': 'Duplicate vital signs ignored',
+            'patient_id': patient_id_str,
+            'duplicate': True
+        }), 200
     
     try:
-        # Get encryption key from environment
-        encryption_key = os.getenv('DB_ENCRYPTION_KEY', 'default-32-char-key-change-this!')
-        
-        # Derive Fernet key from encryption key
-        key_hash = hashlib.sha256(encryption_key.encode()).digest()
-        fernet_key = base64.urlsafe_b64encode(key_hash)
-        cipher = Fernet(fernet_key)
+        cipher = _get_vitals_cipher()
         
         # Decrypt vitals
         encrypted_bytes = base64.b64decode(encrypted_vitals)
         decrypted_bytes = cipher.decrypt(encrypted_bytes)
-        vitals_data = json.loads(decrypted_bytes.decode('utf-8'))
-        
-        # Find or create patient
-        # First try to find by patient_id string match (e.g., "P001")
-        patient = Patient.query.filter_by(mrn=patient_id_str).first()
-        
-        if not patient:
-            # Create new patient record with minimal info
-            patient = Patient(
-                mrn=patient_id_str,
-                first_name=f"Patient {patient_id_str}",
-                last_name="",
-                date_of_birth=datetime(2000, 1, 1).date(),  # Placeholder
-                gender='unknown',
-                status='admitted'
-            )
-            db.session.add(patient)
-            db.session.commit()
+        vitals_data = orjson.loads(decrypted_bytes)
         
         # Parse timestamp
         timestamp_str = vitals_data.get('timestamp')
         if timestamp_str:
-            # Expected format: "2025-01-19 12:45:10"
-            recorded_at = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
+            # Expected format: "2025-01-19 12:45:10" (ISO 8601 with a space separator)
+            recorded_at = datetime.fromisoformat(timestamp_str)
         else:
             recorded_at = datetime.utcnow()
         
-        # Create new vital sign record with all fields
-        new_vitals = PatientVitalSign(
-            patient_id=patient.patient_id,
-            heart_rate=vitals_data.get('heart_rate'),
-            spo2=vitals_data.get('spo2'),
-            bp_systolic=vitals_data.get('bp_systolic'),
-            bp_diastolic=vitals_data.get('bp_diastolic'),
-            respiratory_rate=vitals_data.get('respiratory_rate'),
-            temperature=vitals_data.get('temperature'),
-            etco2=vitals_data.get('etco2'),
-            fio2=vitals_data.get('fio2'),
-            blood_glucose=vitals_data.get('blood_glucose'),
-            lactate=vitals_data.get('lactate'),
-            wbc_count=vitals_data.get('wbc_count'),
-            anomaly_score=vitals_data.get('anomaly_score'),
-            recorded_by=None,  # No user - automated system
-            recorded_at=recorded_at
-        )
-        
-        db.session.add(new_vitals)
-        db.session.commit()
-        
-        # Emit real-time update via WebSocket
+        # Hand off to the batch writer; the row is committed within one flush interval
+        _start_vitals_writer(current_app._get_current_object())
         try:
-            from app import socketio
-            socketio.emit('vitals_update', {
-                'patient_id': patient_id_str,
-                'vitals': vitals_data,
-                'anomaly_score': vitals_data.get('anomaly_score'),
-                'timestamp': timestamp_str or datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            }, namespace='/')
-        except Exception as emit_error:
-            print(f"WARNING: WebSocket emit failed: {emit_error}")
-        
-        return jsonify({
-            'status': 'success',
-            'message': 'Vital signs saved to database',
-            'vital_id': new_vitals.vital_id,
-            'patient_id': patient_id_str,
-            'db_patient_id': patient.patient_id
-        }), 200
+            _vitals_queue.put_nowait((patient_id_str, vitals_data, timestamp_str, recorded_at))
+        except queue.Full:
+            dedup_cache.delete(payload_key)
+            print(f"WARNING: Vitals writer backlog full, rejecting reading for patient {patient_id_str}")
+            return json_response({
+                'status': 'error',
+                'message': 'Vitals writer is backlogged, retry later'
+            }), 503
+        
+        return json_response({
+            'status': 'accepted',
+            'message': 'Vital signs queued for saving',
+            'patient_id': patient_id_str
+        }), 202
         
     except Exception as e:
-        import traceback
+        # Let main_host retry a payload that failed here
+        dedup_cache.delete(payload_key)
         error_detail = traceback.format_exc()
         print(f"ERROR: Error saving encrypted vitals: {str(e)}")
         print(error_detail)
-        return jsonify({
+        return json_response({
             'status': 'error',
             'message': f'Failed to save vitals: {str(e)}'
         }), 500
\ No newline at end of file
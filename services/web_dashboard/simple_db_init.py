@@ -7,6 +7,86 @@ import os
 import sys
 from datetime import datetime
 
+# New SQLCipher databases use 8 KiB pages (half the per-page AES/HMAC work of
+# the old 4 KiB default). The size can't be read back from an encrypted file,
+# so it is stored next to the database for the app's connections to reuse.
+CIPHER_PAGE_SIZE = 8192
+CIPHER_PAGE_SIZE_SUFFIX = '.cipher_page_size'
+
+# Full schema, created in one executescript() call
+SCHEMA_SQL = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(256) NOT NULL,
+    first_name VARCHAR(50),
+    last_name VARCHAR(50),
+    role VARCHAR(20) NOT NULL,
+    requested_role VARCHAR(20),
+    department VARCHAR(50),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_login DATETIME,
+    is_active BOOLEAN DEFAULT 1
+);
+
+CREATE TABLE patients (
+    patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mrn VARCHAR(20) UNIQUE NOT NULL,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50) NOT NULL,
+    date_of_birth DATE NOT NULL,
+    gender VARCHAR(10) NOT NULL,
+    blood_type VARCHAR(3),
+    address VARCHAR(255),
+    phone VARCHAR(20),
+    email VARCHAR(100),
+    emergency_contact VARCHAR(100),
+    emergency_phone VARCHAR(20),
+    admission_date DATETIME,
+    discharge_date DATETIME,
+    status VARCHAR(20) NOT NULL,
+    notes TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE patient_locations (
+    location_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id INTEGER NOT NULL,
+    hospital VARCHAR(50) NOT NULL,
+    department VARCHAR(50) NOT NULL,
+    ward VARCHAR(50) NOT NULL,
+    bed VARCHAR(20),
+    assigned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    active BOOLEAN DEFAULT 1,
+    FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
+);
+
+-- Per-patient location history (matches PatientLocation.__table_args__)
+CREATE INDEX ix_patient_locations_patient_assigned
+    ON patient_locations (patient_id, assigned_at DESC);
+
+-- Active-location lookups (matches PatientLocation.__table_args__)
+CREATE INDEX ix_patient_locations_patient_active
+    ON patient_locations (patient_id, active);
+
+CREATE TABLE user_sessions (
+    session_id VARCHAR(128) PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    ip_address VARCHAR(45),
+    user_agent VARCHAR(256),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+CREATE INDEX ix_user_sessions_user_expires
+    ON user_sessions (user_id, expires_at);
+"""
+
+
 def create_simple_database():
     """Create database and tables using raw SQL"""
     
@@ -24,11 +104,16 @@ def create_simple_database():
     # Check if encryption is enabled
     ENABLE_DB_ENCRYPTION = os.getenv('ENABLE_DB_ENCRYPTION', 'false').lower() == 'true'
     DB_ENCRYPTION_KEY = os.getenv('DB_ENCRYPTION_KEY', 'dev-db-key-change-in-production')
+    DB_CIPHER_MEMORY_SECURITY = os.getenv('DB_CIPHER_MEMORY_SECURITY', 'false').lower() == 'true'
     
-    # Remove existing database if it exists
+    # Remove existing database (and its stored page size) if it exists
     if os.path.exists(db_path):
         os.remove(db_path)
         print("Removed existing database")
+    if os.path.exists(db_path + CIPHER_PAGE_SIZE_SUFFIX):
+        os.remove(db_path + CIPHER_PAGE_SIZE_SUFFIX)
+    
+    cipher_page_size = None
     
     # Try to use SQLCipher if encryption is enabled
     if ENABLE_DB_ENCRYPTION:
@@ -36,9 +121,12 @@ def create_simple_database():
             from pysqlcipher3 import dbapi2 as sqlcipher
             conn = sqlcipher.connect(db_path)
             cursor = conn.cursor()
-            # Set encryption key
-            cursor.execute(f"PRAGMA key = '{DB_ENCRYPTION_KEY}'")
-            cursor.execute("PRAGMA cipher_page_size = 4096")
+            # Set encryption key (PRAGMA takes no bind parameters, so quote it as a literal)
+            escaped_key = DB_ENCRYPTION_KEY.replace("'", "''")
+            cursor.execute(f"PRAGMA key = '{escaped_key}'")
+            cipher_page_size = CIPHER_PAGE_SIZE
+            cursor.execute(f"PRAGMA cipher_page_size = {cipher_page_size}")
+            cursor.execute(f"PRAGMA cipher_memory_security = {'ON' if DB_CIPHER_MEMORY_SECURITY else 'OFF'}")
             print("Using SQLCipher encryption")
         except ImportError:
             print("WARNING: SQLCipher not available, falling back to plain SQLite")
@@ -52,77 +140,21 @@ def create_simple_database():
         cursor = conn.cursor()
         print("Using plain SQLite (encryption disabled)")
     
+    # WAL persists in the database file; the rest tune this short-lived
+    # init connection (16 MiB page cache is plenty for the schema + seed)
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.execute("PRAGMA mmap_size = 268435456")
+    cursor.execute("PRAGMA cache_size = -16384")
+    cursor.execute("PRAGMA trusted_schema = OFF")
+    
+    # Manage the transaction ourselves: schema and seed rows commit together
+    conn.isolation_level = None
+    
     try:
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password_hash VARCHAR(256) NOT NULL,
-                first_name VARCHAR(50),
-                last_name VARCHAR(50),
-                role VARCHAR(20) NOT NULL,
-                requested_role VARCHAR(20),
-                department VARCHAR(50),
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_login DATETIME,
-                is_active BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        # Create patients table
-        cursor.execute('''
-            CREATE TABLE patients (
-                patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                mrn VARCHAR(20) UNIQUE NOT NULL,
-                first_name VARCHAR(50) NOT NULL,
-                last_name VARCHAR(50) NOT NULL,
-                date_of_birth DATE NOT NULL,
-                gender VARCHAR(10) NOT NULL,
-                blood_type VARCHAR(3),
-                address VARCHAR(255),
-                phone VARCHAR(20),
-                email VARCHAR(100),
-                emergency_contact VARCHAR(100),
-                emergency_phone VARCHAR(20),
-                admission_date DATETIME,
-                discharge_date DATETIME,
-                status VARCHAR(20) NOT NULL,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create patient_locations table
-        cursor.execute('''
-            CREATE TABLE patient_locations (
-                location_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                patient_id INTEGER NOT NULL,
-                hospital VARCHAR(50) NOT NULL,
-                department VARCHAR(50) NOT NULL,
-                ward VARCHAR(50) NOT NULL,
-                bed VARCHAR(20),
-                assigned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                active BOOLEAN DEFAULT 1,
-                FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
-            )
-        ''')
-        
-        # Create user_sessions table
-        cursor.execute('''
-            CREATE TABLE user_sessions (
-                session_id VARCHAR(128) PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                ip_address VARCHAR(45),
-                user_agent VARCHAR(256),
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                expires_at DATETIME,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        # executescript() commits anything pending first, so BEGIN goes inside the script
+        cursor.executescript('BEGIN IMMEDIATE;' + SCHEMA_SQL)
         
         print("Database tables created successfully!")
         
@@ -130,15 +162,23 @@ def create_simple_database():
         from werkzeug.security import generate_password_hash
         admin_password_hash = generate_password_hash('admin')
         
-        cursor.execute('''
+        seed_users = [
+            ('admin', 'admin@hospital.com', admin_password_hash, 'System', 'Administrator', 'admin', 1),
+        ]
+        
+        # One prepared statement for all seed rows
+        cursor.executemany('''
             INSERT INTO users (username, email, password_hash, first_name, last_name, role, is_active)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', ('admin', 'admin@hospital.com', admin_password_hash, 'System', 'Administrator', 'admin', 1))
+        ''', seed_users)
         
         print("Created admin user: username=admin, password=admin")
         
         # Commit changes
         conn.commit()
+        if cipher_page_size:
+            with open(db_path + CIPHER_PAGE_SIZE_SUFFIX, 'w') as f:
+                f.write(str(cipher_page_size))
         print("Database initialized successfully!")
         
     except Exception as e:
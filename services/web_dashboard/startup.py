@@ -6,7 +6,6 @@ Handles database initialization and starts the Flask app
 
 import os
 import sys
-import subprocess
 
 def main():
     print("Starting Hospital Web Dashboard...")
@@ -18,22 +17,41 @@ def main():
     # Ensure instance directory exists
     os.makedirs("/app/instance", exist_ok=True)
     
-    if not os.path.exists(db_path) or os.path.getsize(db_path) == 0:
+    # One stat covers both the missing and the empty case
+    try:
+        need_init = os.stat(db_path).st_size == 0
+    except FileNotFoundError:
+        need_init = True
+    
+    if need_init:
         print("Initializing database...")
+        # Run in this interpreter rather than paying for a second Python startup
         try:
-            result = subprocess.run([sys.executable, "simple_db_init.py"], 
-                                  capture_output=True, text=True, check=True)
-            print("Database initialized!")
-        except subprocess.CalledProcessError as e:
-            print(f"ERROR: Database initialization failed: {e}")
-            print(f"stdout: {e.stdout}")
-            print(f"stderr: {e.stderr}")
-            sys.exit(1)
-        except FileNotFoundError:
+            from simple_db_init import create_simple_database
+        except ImportError:
             print("WARNING: simple_db_init.py not found, skipping database initialization")
+        else:
+            try:
+                create_simple_database()
+                print("Database initialized!")
+            except Exception as e:
+                print(f"ERROR: Database initialization failed: {e}")
+                sys.exit(1)
     else:
         print("INFO: Database already exists")
     
+    if os.environ.get('WSGI_SERVER', '').lower() == 'gunicorn':
+        # One eventlet worker serves many concurrent requests and WebSockets while
+        # waiting on main_host/DB I/O; Flask-SocketIO needs a single worker
+        # (or sticky sessions + a message queue) so scale with connections, not -w
+        print("Starting Flask application under gunicorn (eventlet worker)...")
+        os.environ['SOCKETIO_ASYNC_MODE'] = 'eventlet'
+        os.execvp('gunicorn', [
+            'gunicorn', '-k', 'eventlet', '-w', '1',
+            '--worker-connections', os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'),
+            '--bind', '0.0.0.0:5000', 'app:app'
+        ])
+    
     # Start the Flask application
     print("Starting Flask application...")
     try:
@@ -1,8 +1,15 @@
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 from typing import Dict, List, Optional
 import os
 
+from flask import g, has_app_context
+
+from utils.cache import cache, patient_cache
+
 logger = logging.getLogger(__name__)
 
 class MainHostAPI:
@@ -14,13 +21,24 @@ class MainHostAPI:
         # Fallback to localhost if running in development
         if 'localhost' in os.getenv('FLASK_ENV', '') or os.getenv('DEVELOPMENT', False):
             self.base_url = 'http://localhost:8000'
+        
+        # Keep-alive connection pool shared by all calls; retry connection
+        # failures only, so a slow main host doesn't multiply the timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(total=2, read=False, backoff_factor=0.1)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def get_dashboard_data(self) -> Optional[Dict]:
         """Get all dashboard data from main host"""
         try:
-            response = requests.get(f"{self.base_url}/api/dashboard-data", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/dashboard-data", timeout=5)
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to fetch dashboard data: {e}")
             return None
@@ -28,9 +46,9 @@ class MainHostAPI:
     def get_patients(self) -> List[str]:
         """Get list of all patients from main host"""
         try:
-            response = requests.get(f"{self.base_url}/api/patients", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/patients", timeout=5)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             return data.get('patients', [])
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to fetch patients: {e}")
@@ -39,12 +57,40 @@ class MainHostAPI:
     def get_patient_data(self, patient_id: str) -> Optional[Dict]:
         """Get data for a specific patient from main host"""
         try:
-            response = requests.get(f"{self.base_url}/api/patient/{patient_id}", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/patient/{patient_id}", timeout=5)
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to fetch patient data for {patient_id}: {e}")
             return None
 
 # Global instance
-main_host_api = MainHostAPI()
\ No newline at end of file
+main_host_api = MainHostAPI()
+
+# Main host data is polled every couple of seconds, so pages rendered within
+# that window share one fetch
+_DASHBOARD_DATA_TTL = 2
+_PATIENT_DATA_TTL = 5
+
+def get_dashboard_data() -> Optional[Dict]:
+    """Get dashboard data, fetching from main host at most once per request and TTL"""
+    if not has_app_context():
+        return main_host_api.get_dashboard_data()
+    if '_dashboard_data' not in g:
+        data = cache.get('main_host:dashboard_data')
+        if data is None:
+            data = main_host_api.get_dashboard_data()
+            if data is not None:
+                cache.set('main_host:dashboard_data', data, timeout=_DASHBOARD_DATA_TTL)
+        g._dashboard_data = data
+    return g._dashboard_data
+
+def get_patient_data(patient_id: str) -> Optional[Dict]:
+    """Get a patient's main host data, cached briefly per patient"""
+    data = patient_cache.get(patient_id)
+    if data is None:
+        data = main_host_api.get_patient_data(patient_id)
+        # Main host answers unknown IDs with empty data; only cache real patients
+        if data and data.get('data'):
+            patient_cache.set(patient_id, data, timeout=_PATIENT_DATA_TTL)
+    return data
@@ -0,0 +1,32 @@
+import os
+
+from flask_caching import Cache
+
+# Shared cache; in-process by default, set CACHE_TYPE=RedisCache and
+# CACHE_REDIS_URL to share entries between workers
+cache = Cache()
+
+# Separate store for vitals dedup keys, so telemetry-rate writes never evict
+# (or share a threshold with) the page/data entries in `cache`
+dedup_cache = Cache()
+
+# Per-patient main host responses; keyed by URL input from a public page, so
+# kept apart from `cache` with their own size limit
+patient_cache = Cache()
+
+def init_cache(app):
+    """Configure the shared cache from the environment and bind it to the app"""
+    app.config.setdefault('CACHE_TYPE', os.environ.get('CACHE_TYPE', 'SimpleCache'))
+    app.config.setdefault('CACHE_DEFAULT_TIMEOUT', 30)
+    if os.environ.get('CACHE_REDIS_URL'):
+        app.config.setdefault('CACHE_REDIS_URL', os.environ['CACHE_REDIS_URL'])
+    cache.init_app(app)
+    dedup_cache.init_app(app, config={
+        'CACHE_THRESHOLD': int(os.environ.get('DEDUP_CACHE_THRESHOLD', '10000')),
+        'CACHE_KEY_PREFIX': 'vitals_dedup:'
+    })
+    patient_cache.init_app(app, config={
+        'CACHE_THRESHOLD': int(os.environ.get('PATIENT_CACHE_THRESHOLD', '1000')),
+        'CACHE_KEY_PREFIX': 'main_host_patient:'
+    })
+    return cache
@@ -0,0 +1,38 @@
+import hashlib
+
+import orjson
+from flask import Response, make_response, request, session
+
+
+def conditional_html(html: str, max_age: int):
+    """
+    Wrap rendered HTML in a response the browser may reuse for max_age seconds
+    and revalidate with If-None-Match (304 with no body when unchanged).
+    Pages show the logged-in user and flash messages, so caching stays private.
+    """
+    response = make_response(html)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=8).hexdigest())
+    return response.make_conditional(request)
+
+
+def conditional_render(etag: str, render, max_age: int):
+    """
+    Like conditional_html, but with an ETag known before rendering: a matching
+    If-None-Match gets a 304 without calling render(). Pending flash messages
+    always force a render so they are shown (and consumed) on this response.
+    """
+    if '_flashes' not in session and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render())
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.set_etag(etag)
+    return response
+
+
+def json_response(obj, status: int = 200) -> Response:
+    """jsonify() replacement that encodes with orjson"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')